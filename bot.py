@@ -7,6 +7,13 @@ import asyncio
 import logging
 import sys
 from config.settings import INTEGRATIONS
+from modules.price_tracker import price_tracker
+
+# uvloop is optional; fall back to the default asyncio event loop without it
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 # Configure logging
 logging.basicConfig(
@@ -15,38 +22,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Integration runners are imported lazily so disabled integrations' dependencies never load
+def load_matrix_runner():
+    """Import the Matrix bot runner"""
+    from integrations.matrix_integration import run_matrix_bot
+    return run_matrix_bot
+
+def load_discord_runner():
+    """Import the Discord bot runner"""
+    from integrations.discord_integration import run_discord_bot
+    return run_discord_bot
+
+# Supported integrations: (settings key, banner label, runner loader)
+INTEGRATION_RUNNERS = (
+    ('matrix', '📡 Matrix', load_matrix_runner),
+    ('discord', '💬 Discord', load_discord_runner),
+)
+
 async def main():
     """Main bot initialization and event loop"""
     tasks = []
     
-    # Check which integrations are enabled
-    matrix_enabled = INTEGRATIONS.get('matrix', True)
-    discord_enabled = INTEGRATIONS.get('discord', False)
-    
-    print("\n" + "=" * 50)
-    print("💰 Price Tracker & World Clock Bot Starting...")
-    print("=" * 50)
-    print(f"📡 Matrix Integration: {'✅ ENABLED' if matrix_enabled else '❌ DISABLED'}")
-    print(f"💬 Discord Integration: {'✅ ENABLED' if discord_enabled else '❌ DISABLED'}")
-    print("=" * 50 + "\n")
+    banner = [
+        "\n" + "=" * 50,
+        "💰 Price Tracker & World Clock Bot Starting...",
+        "=" * 50,
+    ]
+    banner.extend(
+        f"{label} Integration: {'✅ ENABLED' if INTEGRATIONS.get(key) else '❌ DISABLED'}"
+        for key, label, _ in INTEGRATION_RUNNERS
+    )
+    banner.append("=" * 50 + "\n")
+    print("\n".join(banner))
     
-    # Start Matrix bot if enabled
-    if matrix_enabled:
-        logger.info("Starting Matrix integration...")
-        from integrations.matrix_integration import run_matrix_bot
-        tasks.append(asyncio.create_task(run_matrix_bot()))
-    
-    # Start Discord bot if enabled  
-    if discord_enabled:
-        logger.info("Starting Discord integration...")
-        from integrations.discord_integration import run_discord_bot
-        tasks.append(asyncio.create_task(run_discord_bot()))
+    # Start each enabled integration
+    for key, _, load_runner in INTEGRATION_RUNNERS:
+        if not INTEGRATIONS.get(key):
+            continue
+        logger.info("Starting %s integration...", key.capitalize())
+        runner = load_runner()
+        tasks.append(asyncio.create_task(runner()))
     
     if not tasks:
         logger.error("No integrations enabled! Enable at least one integration in .env file.")
-        print("\n❌ ERROR: No integrations enabled!")
-        print("Please set at least one of the following to true in your .env file:")
-        print("  ENABLE_MATRIX, ENABLE_DISCORD")
+        print(
+            "\n❌ ERROR: No integrations enabled!\n"
+            "Please set at least one of the following to true in your .env file:\n"
+            "  ENABLE_MATRIX, ENABLE_DISCORD"
+        )
         return
     
     # Wait for all tasks
@@ -58,8 +81,14 @@ async def main():
         for task in tasks:
             task.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        # Release pooled upstream connections shared by all integrations
+        await price_tracker.close_session()
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -67,6 +96,6 @@ if __name__ == "__main__":
         print("\n👋 Goodbye!")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         print(f"\n❌ Fatal error: {e}")
         sys.exit(1)
@@ -20,12 +20,14 @@ USERNAME = os.getenv("MATRIX_USERNAME")
 PASSWORD = os.getenv("MATRIX_PASSWORD")
 
 # Matrix Settings
-MATRIX_SYNC_TIMEOUT = int(os.getenv("MATRIX_SYNC_TIMEOUT", "10000"))  # 10 seconds default
-MATRIX_REQUEST_TIMEOUT = int(os.getenv("MATRIX_REQUEST_TIMEOUT", "20"))  # 20 seconds default
+MATRIX_SYNC_TIMEOUT = int(os.getenv("MATRIX_SYNC_TIMEOUT", "30000"))  # 30 seconds default
+MATRIX_REQUEST_TIMEOUT = int(os.getenv("MATRIX_REQUEST_TIMEOUT", "40"))  # 40 seconds default, must exceed the sync timeout
 
 # Matrix Auto-Invite Settings
 ENABLE_AUTO_INVITE = os.getenv("ENABLE_AUTO_INVITE", "true").lower() == "true"
-ALLOWED_INVITE_USERS = os.getenv("ALLOWED_INVITE_USERS", "").split(",") if os.getenv("ALLOWED_INVITE_USERS") else []
+ALLOWED_INVITE_USERS = frozenset(
+    user.strip() for user in os.getenv("ALLOWED_INVITE_USERS", "").split(",") if user.strip()
+)
 
 # Discord credentials - no defaults for sensitive data
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
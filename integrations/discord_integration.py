@@ -4,11 +4,80 @@ Discord integration for Price Tracker & World Clock Bot
 import discord
 from discord.ext import commands
 import asyncio
+import contextlib
 import logging
 from config.settings import DISCORD_TOKEN, BOT_USERNAME, ENABLE_PRICE_TRACKING, ENABLE_STOCK_MARKET
 
 logger = logging.getLogger(__name__)
 
+# Startup banner only depends on settings, so build it once
+STARTUP_BANNER = "\n".join([
+    "=" * 50,
+    "💰 Price Tracker & World Clock Bot - Discord Integration Active!",
+    "=" * 50,
+    "✅ Discord bot starting...",
+    f"✅ Bot Name: {BOT_USERNAME.capitalize()}",
+    "📝 Commands: Use ? prefix (e.g., ?help)",
+    "💰 Price tracking: ?price <crypto> [currency] or ?price <from> <to>",
+    "📊 Stock market: ?stonks <ticker> for stock data",
+    "🕐 World clock: ?clock <location> for time info",
+    "=" * 50,
+])
+
+# A typing indicator lasts about 10 seconds, so refresh it before it expires
+TYPING_REFRESH = 8
+
+# Typing indicators for lookups still in progress, by channel. Concurrent
+# lookups in a channel share one indicator; the entry is removed when the
+# last of them finishes, so only channels with a lookup running are kept.
+active_typing = {}
+
+async def send_typing(ctx):
+    """Show the typing indicator once, ignoring failures"""
+    try:
+        await ctx.typing()
+    except Exception as e:
+        # The indicator is cosmetic; never let it fail the command
+        logger.debug("Error sending typing indicator: %s", e)
+
+async def keep_typing(ctx, stop: asyncio.Event):
+    """Show the typing indicator until stop is set, refreshing it before it expires"""
+    while not stop.is_set():
+        await send_typing(ctx)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=TYPING_REFRESH)
+        except asyncio.TimeoutError:
+            pass
+
+@contextlib.asynccontextmanager
+async def background_typing(ctx):
+    """Show the typing indicator while the body runs, without delaying it.
+    
+    When the last lookup in the channel exits, the indicator is stopped and
+    any typing request in flight is awaited, so a reply sent afterwards always
+    arrives after it. A body that finishes without yielding (a cache hit)
+    sends no typing request at all.
+    """
+    channel_id = ctx.channel.id
+    indicator = active_typing.get(channel_id)
+    if indicator is None:
+        stop = asyncio.Event()
+        indicator = active_typing[channel_id] = {
+            'lookups': 0,
+            'stop': stop,
+            'task': asyncio.create_task(keep_typing(ctx, stop))
+        }
+    indicator['lookups'] += 1
+    
+    try:
+        yield
+    finally:
+        indicator['lookups'] -= 1
+        if indicator['lookups'] == 0:
+            del active_typing[channel_id]
+            indicator['stop'].set()
+            await asyncio.gather(indicator['task'], return_exceptions=True)
+
 class PriceTrackerDiscordBot(commands.Bot):
     """Discord bot implementation for Price Tracker & World Clock"""
     
@@ -32,8 +101,8 @@ class PriceTrackerDiscordBot(commands.Bot):
         
     async def on_ready(self):
         """Called when bot is ready"""
-        logger.info(f'Discord bot logged in as {self.user} (ID: {self.user.id})')
-        logger.info(f'Connected to {len(self.guilds)} guilds')
+        logger.info("Discord bot logged in as %s (ID: %s)", self.user, self.user.id)
+        logger.info("Connected to %s guilds", len(self.guilds))
         
         # Set bot status
         await self.change_presence(
@@ -55,10 +124,12 @@ class PriceCommands(commands.Cog):
         self.price_tracker = price_tracker
         self.stock_tracker = stock_tracker
         self.world_clock = world_clock
+        # Help content never changes, so build the embed once
+        self.help_embed = self.build_help_embed()
         
-    @commands.command(name='help', help='Show this help message')
-    async def help_command(self, ctx):
-        """Custom help command"""
+    @staticmethod
+    def build_help_embed() -> discord.Embed:
+        """Build the static help embed"""
         embed = discord.Embed(
             title=f"💰 Price Tracker & World Clock Bot Commands",
             description="Track cryptocurrency, stock prices, and world time!",
@@ -90,23 +161,28 @@ class PriceCommands(commands.Cog):
         )
         
         embed.set_footer(text=f"Price Tracker & World Clock Bot")
-        await ctx.send(embed=embed)
+        return embed
+        
+    @commands.command(name='help', help='Show this help message')
+    async def help_command(self, ctx):
+        """Custom help command"""
+        await ctx.send(embed=self.help_embed)
         
     @commands.command(name='clock', help='Get time for a city or country')
     async def clock_command(self, ctx, *, location: str = None):
         """Get world clock time"""
-        async with ctx.typing():
+        async with background_typing(ctx):
             query = location if location else ""
             response = await self.world_clock.handle_clock_command(query)
-            
-            # Create embed
-            embed = discord.Embed(
-                title="🕐 World Clock",
-                description=response,
-                color=discord.Color.blue()
-            )
-            
-            await ctx.send(embed=embed)
+        
+        # Create embed
+        embed = discord.Embed(
+            title="🕐 World Clock",
+            description=response,
+            color=discord.Color.blue()
+        )
+        
+        await ctx.send(embed=embed)
         
     @commands.command(name='stonks', help='Get stock market information')
     async def stonks_command(self, ctx, *, ticker: str = None):
@@ -115,22 +191,22 @@ class PriceCommands(commands.Cog):
             await ctx.send("Stock tracking feature is not enabled.")
             return
         
-        async with ctx.typing():
+        async with background_typing(ctx):
             if not ticker:
                 # Get market summary
                 response = await self.stock_tracker.get_market_summary()
             else:
                 # Get specific stock info
                 response = await self.stock_tracker.get_stock_info(ticker)
-            
-            # Create embed
-            embed = discord.Embed(
-                title="📊 Stock Market Data",
-                description=response,
-                color=discord.Color.green() if "📈" in response else discord.Color.red()
-            )
-            
-            await ctx.send(embed=embed)
+        
+        # Create embed
+        embed = discord.Embed(
+            title="📊 Stock Market Data",
+            description=response,
+            color=discord.Color.green() if "📈" in response else discord.Color.red()
+        )
+        
+        await ctx.send(embed=embed)
         
     @commands.command(name='price', help='Get cryptocurrency prices or exchange rates')
     async def price_command(self, ctx, *, query: str = "XMR"):
@@ -139,17 +215,18 @@ class PriceCommands(commands.Cog):
             await ctx.send("Price tracking feature is not enabled.")
             return
         
-        async with ctx.typing():
+        async with background_typing(ctx):
             response = await self.price_tracker.get_price_response(f"price {query}")
-            if response:
-                embed = discord.Embed(
-                    title=f"💰 Price Information",
-                    description=response,
-                    color=discord.Color.green()
-                )
-                await ctx.send(embed=embed)
-            else:
-                await ctx.send(f"Couldn't fetch price for {query}")
+        
+        if response:
+            embed = discord.Embed(
+                title=f"💰 Price Information",
+                description=response,
+                color=discord.Color.green()
+            )
+            await ctx.send(embed=embed)
+        else:
+            await ctx.send(f"Couldn't fetch price for {query}")
                 
     @commands.command(name='xmr', help='Get Monero price')
     async def xmr_command(self, ctx):
@@ -170,26 +247,16 @@ async def run_discord_bot():
     # Check for required Discord credentials
     if not DISCORD_TOKEN:
         logger.error("Discord token not configured. Please set DISCORD_TOKEN in .env file")
-        print("\n❌ ERROR: Discord token missing!")
-        print("Please configure DISCORD_TOKEN in your .env file")
+        print("\n❌ ERROR: Discord token missing!\nPlease configure DISCORD_TOKEN in your .env file")
         return
         
     bot = PriceTrackerDiscordBot()
     
-    print("=" * 50)
-    print(f"💰 Price Tracker & World Clock Bot - Discord Integration Active!")
-    print("=" * 50)
-    print("✅ Discord bot starting...")
-    print(f"✅ Bot Name: {BOT_USERNAME.capitalize()}")
-    print("📝 Commands: Use ? prefix (e.g., ?help)")
-    print("💰 Price tracking: ?price <crypto> [currency] or ?price <from> <to>")
-    print("📊 Stock market: ?stonks <ticker> for stock data")
-    print("🕐 World clock: ?clock <location> for time info")
-    print("=" * 50)
+    print(STARTUP_BANNER)
     
     try:
         await bot.start(DISCORD_TOKEN)
     except Exception as e:
-        logger.error(f"Discord bot error: {e}")
+        logger.error("Discord bot error: %s", e)
         await bot.close()
         raise
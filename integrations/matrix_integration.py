@@ -3,7 +3,9 @@ Matrix integration for Price Tracker & World Clock Bot
 """
 import asyncio
 import logging
+import re
 import time
+from collections import OrderedDict
 from pathlib import Path
 from nio import (
     AsyncClient, 
@@ -22,9 +24,40 @@ from config.settings import (
 
 logger = logging.getLogger(__name__)
 
-# Track processed events to avoid duplicates
-processed_events = set()
+# Track processed events to avoid duplicates, oldest evicted first once full
+processed_events = OrderedDict()
+MAX_PROCESSED_EVENTS = 10000
 bot_start_time = time.time()
+# Server timestamps (ms) older than this predate startup, with 5s of slack
+bot_start_cutoff_ms = int((bot_start_time - 5) * 1000)
+
+# Keep references to running command and invite tasks so they aren't garbage
+# collected, and so they can be cancelled on shutdown
+command_tasks = set()
+
+# Filter for the main sync loop: only room messages are handled, so skip
+# presence, typing/receipts and account data
+SYNC_FILTER = {
+    "presence": {"types": []},
+    "account_data": {"types": []},
+    "room": {
+        "ephemeral": {"types": []},
+        "account_data": {"types": []},
+        "state": {"lazy_load_members": True},
+        "timeline": {"types": ["m.room.message"]}
+    }
+}
+
+# Matches **bold** spans in escaped HTML; spans never cross a line break
+BOLD_PATTERN = re.compile(r"\*\*((?:(?!<br/>).)+?)\*\*")
+
+# Escapes HTML special characters and converts newlines in a single pass
+HTML_TRANSLATION = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    "\n": "<br/>"
+})
 
 # Import price, stock trackers, and world clock
 price_tracker = None
@@ -43,29 +76,21 @@ def initialize_handlers():
     stock_tracker = stk
     world_clock = wc
 
-def mark_event_processed(event_id):
-    """Mark an event as processed"""
-    processed_events.add(event_id)
+def markdown_to_html(text: str) -> str:
+    """Convert bot markdown (bold and newlines) to escaped Matrix HTML"""
+    return BOLD_PATTERN.sub(r"<strong>\1</strong>", text.translate(HTML_TRANSLATION))
 
-async def send_message(client, room_id: str, content: dict):
-    """Send a message to a Matrix room"""
-    try:
-        response = await client.room_send(
-            room_id=room_id,
-            message_type="m.room.message",
-            content=content
-        )
-        
-        if response:
-            logger.debug(f"Message sent to room {room_id}")
-            
-    except Exception as e:
-        logger.error(f"Error sending message: {e}")
+def build_text_content(text: str) -> dict:
+    """Build m.text message content with plain and HTML bodies from bot markdown"""
+    return {
+        "msgtype": "m.text",
+        "body": text.replace("**", ""),
+        "format": "org.matrix.custom.html",
+        "formatted_body": markdown_to_html(text)
+    }
 
-async def handle_help_command(client, room, event):
-    """Handle help command for Matrix"""
-    try:
-        help_text = f"""📚 **Price Tracker & World Clock Bot - Available Commands**
+# Help message is static, so render both bodies once at import
+HELP_TEXT = """📚 **Price Tracker & World Clock Bot - Available Commands**
 
 **Price Commands:**
 • `?price <crypto>` - Get cryptocurrency price (default: USD)
@@ -92,185 +117,169 @@ Examples:
 • `?clock paris` - Current time in Paris
 • `?clock tokyo, new york` - Multiple locations"""
 
-        await send_message(
-            client,
-            room.room_id,
-            {
-                "msgtype": "m.text",
-                "body": help_text.replace("**", ""),
-                "format": "org.matrix.custom.html",
-                "formatted_body": help_text.replace("**", "<strong>").replace("**", "</strong>")
-                                           .replace("\n", "<br/>")
-            }
+HELP_CONTENT = build_text_content(HELP_TEXT)
+
+PRICE_USAGE_CONTENT = build_text_content("Usage: ?price <crypto> [currency] or ?price <from> <to>")
+
+def start_tracked_task(coro):
+    """Run a coroutine as a task tracked in command_tasks"""
+    task = asyncio.create_task(coro)
+    command_tasks.add(task)
+    task.add_done_callback(command_tasks.discard)
+
+def trim_processed_events():
+    """Evict the oldest processed events beyond MAX_PROCESSED_EVENTS"""
+    while len(processed_events) > MAX_PROCESSED_EVENTS:
+        processed_events.popitem(last=False)
+
+def mark_event_processed(event_id):
+    """Mark an event as processed"""
+    processed_events[event_id] = None
+    processed_events.move_to_end(event_id)
+    trim_processed_events()
+
+def mark_events_processed(event_ids):
+    """Mark a batch of events as processed"""
+    processed_events.update(dict.fromkeys(event_ids))
+    trim_processed_events()
+
+async def send_message(client, room_id: str, content: dict):
+    """Send a message to a Matrix room"""
+    try:
+        response = await client.room_send(
+            room_id=room_id,
+            message_type="m.room.message",
+            content=content
         )
         
+        if response:
+            logger.debug("Message sent to room %s", room_id)
+            
     except Exception as e:
-        logger.error(f"Error handling help command: {e}")
+        logger.error("Error sending message: %s", e)
 
-async def handle_price_command(client, room, event):
-    """Handle price command for Matrix"""
+async def handle_help_command(client, room, event, args: str):
+    """Handle help command for Matrix"""
     try:
-        if not ENABLE_PRICE_TRACKING:
-            await send_message(
-                client,
-                room.room_id,
-                {
-                    "msgtype": "m.text",
-                    "body": "Price tracking is disabled."
-                }
-            )
-            return
+        await send_message(client, room.room_id, HELP_CONTENT)
         
-        parts = event.body.strip().split(maxsplit=1)
-        query = parts[1] if len(parts) > 1 else "XMR"
+    except Exception as e:
+        logger.error("Error handling help command: %s", e)
+
+async def handle_price_command(client, room, event, args: str):
+    """Handle price command for Matrix"""
+    try:
+        query = args or "XMR"
         
         response = await price_tracker.get_price_response(f"price {query}")
         
         if not response:
-            response = "Usage: ?price <crypto> [currency] or ?price <from> <to>"
+            await send_message(client, room.room_id, PRICE_USAGE_CONTENT)
+            return
         
-        await send_message(
-            client,
-            room.room_id,
-            {
-                "msgtype": "m.text",
-                "body": response.replace("**", ""),
-                "format": "org.matrix.custom.html",
-                "formatted_body": response.replace("**", "<strong>").replace("**", "</strong>")
-                                         .replace("\n", "<br/>")
-            }
-        )
+        await send_message(client, room.room_id, build_text_content(response))
         
     except Exception as e:
-        logger.error(f"Error handling price command: {e}")
+        logger.error("Error handling price command: %s", e)
 
-async def handle_xmr_command(client, room, event):
+async def handle_xmr_command(client, room, event, args: str):
     """Handle XMR price command for Matrix"""
     try:
-        if not ENABLE_PRICE_TRACKING:
-            await send_message(
-                client,
-                room.room_id,
-                {
-                    "msgtype": "m.text",
-                    "body": "Price tracking is disabled."
-                }
-            )
-            return
-        
         response = await price_tracker.get_price_response("price XMR")
         
-        await send_message(
-            client,
-            room.room_id,
-            {
-                "msgtype": "m.text",
-                "body": response.replace("**", ""),
-                "format": "org.matrix.custom.html",
-                "formatted_body": response.replace("**", "<strong>").replace("**", "</strong>")
-                                         .replace("\n", "<br/>")
-            }
-        )
+        await send_message(client, room.room_id, build_text_content(response))
         
     except Exception as e:
-        logger.error(f"Error handling XMR command: {e}")
+        logger.error("Error handling XMR command: %s", e)
 
-async def handle_stonks_command(client, room, event):
+async def handle_stonks_command(client, room, event, args: str):
     """Handle stock market command for Matrix"""
     try:
-        if not ENABLE_STOCK_MARKET:
-            await send_message(
-                client,
-                room.room_id,
-                {
-                    "msgtype": "m.text",
-                    "body": "Stock tracking is disabled."
-                }
-            )
-            return
-        
-        parts = event.body.strip().split()
-        
-        if len(parts) == 1:
+        if not args:
             response = await stock_tracker.get_market_summary()
         else:
-            ticker = parts[1]
+            ticker = args.split()[0]
             response = await stock_tracker.get_stock_info(ticker)
         
-        await send_message(
-            client,
-            room.room_id,
-            {
-                "msgtype": "m.text",
-                "body": response.replace("**", ""),
-                "format": "org.matrix.custom.html",
-                "formatted_body": response.replace("**", "<strong>").replace("**", "</strong>")
-                                         .replace("\n", "<br/>")
-            }
-        )
+        await send_message(client, room.room_id, build_text_content(response))
         
     except Exception as e:
-        logger.error(f"Error handling stonks command: {e}")
+        logger.error("Error handling stonks command: %s", e)
 
-async def handle_clock_command(client, room, event):
+async def handle_clock_command(client, room, event, args: str):
     """Handle world clock command for Matrix"""
     try:
-        parts = event.body.strip().split(maxsplit=1)
-        query = parts[1] if len(parts) > 1 else ""
-        
-        response = await world_clock.handle_clock_command(query)
+        response = await world_clock.handle_clock_command(args)
         
-        await send_message(
-            client,
-            room.room_id,
-            {
-                "msgtype": "m.text",
-                "body": response.replace("**", ""),
-                "format": "org.matrix.custom.html",
-                "formatted_body": response.replace("**", "<strong>").replace("**", "</strong>")
-                                         .replace("\n", "<br/>")
-            }
-        )
+        await send_message(client, room.room_id, build_text_content(response))
         
     except Exception as e:
-        logger.error(f"Error handling clock command: {e}")
+        logger.error("Error handling clock command: %s", e)
+
+def make_disabled_handler(message: str):
+    """Build a command handler that replies that its feature is disabled"""
+    content = {
+        "msgtype": "m.text",
+        "body": message
+    }
+    
+    async def handle_disabled_command(client, room, event, args: str):
+        await send_message(client, room.room_id, content)
+    
+    return handle_disabled_command
+
+# Command dispatch table
+COMMAND_HANDLERS = {
+    '?help': handle_help_command,
+    '?price': handle_price_command,
+    '?xmr': handle_xmr_command,
+    '?stonks': handle_stonks_command,
+    '?clock': handle_clock_command,
+}
+
+# Feature toggles are fixed at startup, so resolve disabled commands once
+if not ENABLE_PRICE_TRACKING:
+    COMMAND_HANDLERS['?price'] = COMMAND_HANDLERS['?xmr'] = make_disabled_handler("Price tracking is disabled.")
+if not ENABLE_STOCK_MARKET:
+    COMMAND_HANDLERS['?stonks'] = make_disabled_handler("Stock tracking is disabled.")
 
 async def message_callback(client, room: MatrixRoom, event: RoomMessageText):
     """Handle incoming messages"""
     
+    event_id = event.event_id
+    
     # Check if already processed
-    if event.event_id in processed_events:
+    if event_id in processed_events:
         return
     
     # Check if message is from before bot started
-    message_timestamp = event.server_timestamp / 1000 if event.server_timestamp else time.time()
-    if message_timestamp < (bot_start_time - 5):
-        mark_event_processed(event.event_id)
+    server_timestamp = event.server_timestamp
+    if server_timestamp and server_timestamp < bot_start_cutoff_ms:
+        mark_event_processed(event_id)
         return
     
     # Mark as processed
-    mark_event_processed(event.event_id)
+    mark_event_processed(event_id)
     
     # Ignore our own messages
     if event.sender == client.user_id:
         return
     
-    # Check if message starts with ? for commands
-    if event.body.strip().startswith('?'):
-        command_parts = event.body.strip().split()
-        command = command_parts[0].lower()
-        
-        # Handle commands
-        if command == '?help':
-            await handle_help_command(client, room, event)
-        elif command == '?price':
-            await handle_price_command(client, room, event)
-        elif command == '?xmr':
-            await handle_xmr_command(client, room, event)
-        elif command == '?stonks':
-            await handle_stonks_command(client, room, event)
-        elif command == '?clock':
-            await handle_clock_command(client, room, event)
+    # Only messages starting with ? are commands; lstrip() returns the same
+    # string without copying when there is no leading whitespace
+    body = event.body.lstrip()
+    if not body.startswith('?'):
+        return
+    
+    # Split off the command once; handlers receive the remaining arguments
+    command_parts = body.split(None, 1)
+    command = command_parts[0].lower()
+    args = command_parts[1].strip() if len(command_parts) > 1 else ""
+    
+    # Handle commands in their own task so slow lookups don't stall the sync loop
+    handler = COMMAND_HANDLERS.get(command)
+    if handler:
+        start_tracked_task(handler(client, room, event, args))
 
 async def run_matrix_bot():
     """Run the Matrix bot"""
@@ -280,11 +289,13 @@ async def run_matrix_bot():
     # Check for required Matrix credentials
     if not all([HOMESERVER, USERNAME, PASSWORD]):
         logger.error("Matrix credentials not configured. Please set MATRIX_HOMESERVER, MATRIX_USERNAME, and MATRIX_PASSWORD in .env file")
-        print("\n❌ ERROR: Matrix credentials missing!")
-        print("Please configure the following in your .env file:")
-        print("  - MATRIX_HOMESERVER")
-        print("  - MATRIX_USERNAME")
-        print("  - MATRIX_PASSWORD")
+        print(
+            "\n❌ ERROR: Matrix credentials missing!\n"
+            "Please configure the following in your .env file:\n"
+            "  - MATRIX_HOMESERVER\n"
+            "  - MATRIX_USERNAME\n"
+            "  - MATRIX_PASSWORD"
+        )
         return
     
     # Set up client configuration
@@ -306,65 +317,90 @@ async def run_matrix_bot():
         # Login
         response = await client.login(PASSWORD, device_name=f"{BOT_USERNAME}-bot")
         if not isinstance(response, LoginResponse):
-            logger.error(f"Failed to login to Matrix: {response}")
+            logger.error("Failed to login to Matrix: %s", response)
             return
         
-        logger.info(f"Matrix: Logged in as {client.user_id} with device {response.device_id}")
+        logger.info("Matrix: Logged in as %s with device %s", client.user_id, response.device_id)
         
         # Add event callbacks
-        client.add_event_callback(lambda room, event: asyncio.create_task(message_callback(client, room, event)), RoomMessageText)
+        async def on_message(room, event):
+            await message_callback(client, room, event)
+        
+        client.add_event_callback(on_message, RoomMessageText)
         
         # Check if auto-invite is enabled and add invite callback
         if ENABLE_AUTO_INVITE:
             from modules.invite_handler import invite_callback
-            client.add_event_callback(lambda room, event: asyncio.create_task(invite_callback(client, room, event)), InviteMemberEvent)
+            
+            async def on_invite(room, event):
+                # Join in the background so a slow join doesn't stall the sync loop
+                start_tracked_task(invite_callback(client, room, event))
+            
+            client.add_event_callback(on_invite, InviteMemberEvent)
             logger.info("Auto-invite handling enabled")
         
         # Do initial sync
         logger.info("Matrix: Performing initial sync...")
         sync_filter = {
             "room": {
+                "state": {
+                    "lazy_load_members": True  # Skip member lists we never use
+                },
                 "timeline": {
                     "limit": 1  # Only get the most recent message per room
                 }
             }
         }
         sync_response = await client.sync(timeout=MATRIX_SYNC_TIMEOUT, full_state=False, sync_filter=sync_filter)
-        logger.info(f"Matrix: Initial sync completed. Next batch: {sync_response.next_batch}")
+        logger.info("Matrix: Initial sync completed. Next batch: %s", sync_response.next_batch)
         
         # Mark all messages from initial sync as processed
-        if hasattr(sync_response, 'rooms') and hasattr(sync_response.rooms, 'join'):
-            for room_id, room_data in sync_response.rooms.join.items():
-                if hasattr(room_data, 'timeline') and hasattr(room_data.timeline, 'events'):
-                    for event in room_data.timeline.events:
-                        if hasattr(event, 'event_id'):
-                            mark_event_processed(event.event_id)
+        try:
+            event_ids = [
+                event_id
+                for room_data in sync_response.rooms.join.values()
+                for event in room_data.timeline.events
+                if (event_id := getattr(event, 'event_id', None))
+            ]
+        except AttributeError:
+            # Sync response without joined rooms or timelines
+            event_ids = []
+        mark_events_processed(event_ids)
+        logger.info("Matrix: Marked %s initial sync events as processed", len(event_ids))
         
-        print("=" * 50)
-        print(f"💰 Price Tracker & World Clock Bot - Matrix Integration Active!")
-        print("=" * 50)
-        print(f"✅ Identity: {USERNAME}")
-        print(f"✅ Bot Name: {BOT_USERNAME.capitalize()}")
-        print(f"🔑 Device ID: {response.device_id}")
-        print(f"✅ Auto-invite: {'ENABLED' if ENABLE_AUTO_INVITE else 'DISABLED'}")
-        print("✅ Listening for commands in all joined rooms")
-        print("📚 Commands:")
-        print("  ?help - Show available commands")
-        print("  ?price <crypto> [currency] - Get crypto/fiat prices")
-        print("  ?xmr - Quick Monero price check")
-        print("  ?stonks <ticker> - Get stock market data")
-        print("  ?clock <location> - Get time for a location")
-        print("=" * 50)
+        banner = [
+            "=" * 50,
+            "💰 Price Tracker & World Clock Bot - Matrix Integration Active!",
+            "=" * 50,
+            f"✅ Identity: {USERNAME}",
+            f"✅ Bot Name: {BOT_USERNAME.capitalize()}",
+            f"🔑 Device ID: {response.device_id}",
+            f"✅ Auto-invite: {'ENABLED' if ENABLE_AUTO_INVITE else 'DISABLED'}",
+            "✅ Listening for commands in all joined rooms",
+            "📚 Commands:",
+            "  ?help - Show available commands",
+            "  ?price <crypto> [currency] - Get crypto/fiat prices",
+            "  ?xmr - Quick Monero price check",
+            "  ?stonks <ticker> - Get stock market data",
+            "  ?clock <location> - Get time for a location",
+            "=" * 50,
+        ]
+        print("\n".join(banner))
         
         # Sync forever
         await client.sync_forever(
             timeout=MATRIX_SYNC_TIMEOUT,
+            sync_filter=SYNC_FILTER,
             full_state=False,
             since=sync_response.next_batch
         )
             
     except Exception as e:
-        logger.error(f"Matrix bot error: {e}")
+        logger.error("Matrix bot error: %s", e)
         raise
     finally:
+        # Stop in-flight command and invite tasks before the client they use is closed
+        for task in command_tasks:
+            task.cancel()
+        await asyncio.gather(*command_tasks, return_exceptions=True)
         await client.close()
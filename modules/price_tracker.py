@@ -2,12 +2,19 @@
 import aiohttp
 import asyncio
 import re
+from collections import OrderedDict
 from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
+from config.settings import PRICE_CACHE_TTL, PRICE_FETCH_TIMEOUT
 
-# Cache for exchange rates (5 minute TTL)
-RATE_CACHE = {}
-CACHE_TTL = 300  # 5 minutes
+# Cache for exchange rates (TTL from PRICE_CACHE_TTL, 5 minutes by default),
+# least recently used pairs evicted first once full
+RATE_CACHE = OrderedDict()
+CACHE_TTL = PRICE_CACHE_TTL
+MAX_CACHE_ENTRIES = 1000
+
+# Shared HTTP session, created on first use so it binds to the running loop
+http_session: Optional[aiohttp.ClientSession] = None
 
 class PriceTracker:
     """Handles fetching and formatting price data"""
@@ -57,6 +64,33 @@ class PriceTracker:
         'HELP', 'TEST', 'PING', 'PONG', 'ECHO', 'DEBUG', 'INFO'
     }
     
+    # Request patterns, compiled once and tried in order by parse_price_request
+    # Simple patterns for just crypto symbols (e.g., "btc", "xmr", "eth")
+    SIMPLE_CRYPTO_PATTERNS = (
+        re.compile(r'^([a-z]{2,5})$'),  # Just the crypto symbol
+        re.compile(r'price\s+([a-z]{2,5})$'),  # price btc
+        re.compile(r'^([a-z]{2,5})\s+price$'),  # btc price
+    )
+    
+    # Patterns for crypto prices with specified fiat
+    CRYPTO_PATTERNS = (
+        re.compile(r'\b([a-z]{2,5})\s+(?:to\s+|in\s+)?([a-z]{3,4})\b'),  # btc usd, xmr to eur
+        re.compile(r'\b([a-z]{2,5})\s+price\s+(?:in\s+)?([a-z]{3,4})\b'),  # btc price in usd
+        re.compile(r'price\s+(?:of\s+)?([a-z]{2,5})\s+(?:in\s+)?([a-z]{3,4})\b'),  # price of eth in eur
+    )
+    
+    # Patterns for fiat exchange rates with amounts
+    FIAT_AMOUNT_PATTERNS = (
+        re.compile(r'(\d+(?:\.\d+)?)\s+([a-z]{3})\s+(?:to\s+|in\s+)?([a-z]{3})\b'),  # 100 usd to eur
+        re.compile(r'convert\s+(\d+(?:\.\d+)?)\s+([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b'),  # convert 50 cad to aud
+    )
+    
+    # Patterns for fiat exchange rates without amounts
+    FIAT_PATTERNS = (
+        re.compile(r'\b([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b'),  # usd to eur
+        re.compile(r'exchange\s+rate\s+([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b'),  # exchange rate usd to nzd
+    )
+    
     @staticmethod
     def get_cache_key(from_currency: str, to_currency: str) -> str:
         """Generate cache key for rate pair"""
@@ -70,7 +104,44 @@ class PriceTracker:
         timestamp = cache_entry.get('timestamp')
         if not timestamp:
             return False
-        return (datetime.now() - timestamp).seconds < CACHE_TTL
+        return (datetime.now() - timestamp).total_seconds() < CACHE_TTL
+    
+    @staticmethod
+    def get_session() -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        global http_session
+        if http_session is None or http_session.closed:
+            http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=10, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=PRICE_FETCH_TIMEOUT)
+            )
+        return http_session
+    
+    @staticmethod
+    async def close_session():
+        """Close the shared HTTP session if one is open"""
+        global http_session
+        if http_session is not None and not http_session.closed:
+            await http_session.close()
+        http_session = None
+    
+    @classmethod
+    def get_cache_entry(cls, cache_key: str) -> Optional[dict]:
+        """Return a cache entry if it is still valid, marking it as recently used"""
+        cache_entry = RATE_CACHE.get(cache_key)
+        if not cls.is_cache_valid(cache_entry):
+            return None
+        RATE_CACHE.move_to_end(cache_key)
+        return cache_entry
+    
+    @staticmethod
+    def store_cache_entry(cache_key: str, entry: dict):
+        """Store a timestamped cache entry, evicting the least recently used beyond MAX_CACHE_ENTRIES"""
+        entry['timestamp'] = datetime.now()
+        RATE_CACHE[cache_key] = entry
+        RATE_CACHE.move_to_end(cache_key)
+        while len(RATE_CACHE) > MAX_CACHE_ENTRIES:
+            RATE_CACHE.popitem(last=False)
     
     @classmethod
     async def get_fiat_rate(cls, from_currency: str, to_currency: str) -> Optional[float]:
@@ -80,41 +151,34 @@ class PriceTracker:
         
         # Check cache
         cache_key = cls.get_cache_key(from_currency, to_currency)
-        if cache_key in RATE_CACHE and cls.is_cache_valid(RATE_CACHE[cache_key]):
-            return RATE_CACHE[cache_key]['rate']
+        cached = cls.get_cache_entry(cache_key)
+        if cached:
+            return cached['rate']
         
         try:
             url = f"https://api.frankfurter.app/latest?from={from_currency}&to={to_currency}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        rate = data['rates'].get(to_currency)
-                        if rate:
-                            # Cache the result
-                            RATE_CACHE[cache_key] = {
-                                'rate': rate,
-                                'timestamp': datetime.now()
-                            }
-                            return rate
+            async with cls.get_session().get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    rate = data['rates'].get(to_currency)
+                    if rate:
+                        # Cache the result
+                        cls.store_cache_entry(cache_key, {'rate': rate})
+                        return rate
         except Exception as e:
             print(f"Error fetching fiat rate from Frankfurter: {e}")
         
         # Fallback to ExchangeRate-API if Frankfurter fails
         try:
             url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        rate = data['rates'].get(to_currency)
-                        if rate:
-                            # Cache the result
-                            RATE_CACHE[cache_key] = {
-                                'rate': rate,
-                                'timestamp': datetime.now()
-                            }
-                            return rate
+            async with cls.get_session().get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    rate = data['rates'].get(to_currency)
+                    if rate:
+                        # Cache the result
+                        cls.store_cache_entry(cache_key, {'rate': rate})
+                        return rate
         except Exception as e:
             print(f"Error fetching fiat rate from ExchangeRate-API: {e}")
         
@@ -128,8 +192,9 @@ class PriceTracker:
         
         # Check cache
         cache_key = cls.get_cache_key(crypto, fiat)
-        if cache_key in RATE_CACHE and cls.is_cache_valid(RATE_CACHE[cache_key]):
-            return RATE_CACHE[cache_key]['data']
+        cached = cls.get_cache_entry(cache_key)
+        if cached:
+            return cached['data']
         
         # Get crypto ID for CoinGecko
         crypto_id = cls.CRYPTO_SYMBOLS.get(crypto, crypto.lower())
@@ -137,22 +202,18 @@ class PriceTracker:
         # Try CoinGecko first
         try:
             url = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_id}&vs_currencies={fiat.lower()}&include_24hr_change=true&include_24hr_vol=true"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if crypto_id in data:
-                            price_data = {
-                                'price': data[crypto_id].get(fiat.lower()),
-                                'change_24h': data[crypto_id].get(f'{fiat.lower()}_24h_change'),
-                                'volume_24h': data[crypto_id].get(f'{fiat.lower()}_24h_vol')
-                            }
-                            # Cache the result
-                            RATE_CACHE[cache_key] = {
-                                'data': price_data,
-                                'timestamp': datetime.now()
-                            }
-                            return price_data
+            async with cls.get_session().get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if crypto_id in data:
+                        price_data = {
+                            'price': data[crypto_id].get(fiat.lower()),
+                            'change_24h': data[crypto_id].get(f'{fiat.lower()}_24h_change'),
+                            'volume_24h': data[crypto_id].get(f'{fiat.lower()}_24h_vol')
+                        }
+                        # Cache the result
+                        cls.store_cache_entry(cache_key, {'data': price_data})
+                        return price_data
         except Exception as e:
             print(f"Error fetching crypto price from CoinGecko: {e}")
         
@@ -160,33 +221,29 @@ class PriceTracker:
         try:
             # First get asset data
             url = f"https://api.coincap.io/v2/assets/{crypto_id}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('data'):
-                            price_usd = float(data['data'].get('priceUsd', 0))
-                            change_24h = float(data['data'].get('changePercent24Hr', 0))
-                            volume_24h = float(data['data'].get('volumeUsd24Hr', 0))
-                            
-                            # Convert to requested fiat if not USD
-                            if fiat != 'USD':
-                                fiat_rate = await cls.get_fiat_rate('USD', fiat)
-                                if fiat_rate:
-                                    price_usd *= fiat_rate
-                                    volume_24h *= fiat_rate
-                            
-                            price_data = {
-                                'price': price_usd,
-                                'change_24h': change_24h,
-                                'volume_24h': volume_24h
-                            }
-                            # Cache the result
-                            RATE_CACHE[cache_key] = {
-                                'data': price_data,
-                                'timestamp': datetime.now()
-                            }
-                            return price_data
+            async with cls.get_session().get(url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get('data'):
+                        price_usd = float(data['data'].get('priceUsd', 0))
+                        change_24h = float(data['data'].get('changePercent24Hr', 0))
+                        volume_24h = float(data['data'].get('volumeUsd24Hr', 0))
+                        
+                        # Convert to requested fiat if not USD
+                        if fiat != 'USD':
+                            fiat_rate = await cls.get_fiat_rate('USD', fiat)
+                            if fiat_rate:
+                                price_usd *= fiat_rate
+                                volume_24h *= fiat_rate
+                        
+                        price_data = {
+                            'price': price_usd,
+                            'change_24h': change_24h,
+                            'volume_24h': volume_24h
+                        }
+                        # Cache the result
+                        cls.store_cache_entry(cache_key, {'data': price_data})
+                        return price_data
         except Exception as e:
             print(f"Error fetching crypto price from CoinCap: {e}")
         
@@ -232,17 +289,11 @@ class PriceTracker:
     async def parse_price_request(cls, message: str) -> Optional[Dict]:
         """Parse message for price requests"""
         message_lower = message.lower()
-        
-        # Simple patterns for just crypto symbols (e.g., "btc", "xmr", "eth")
-        simple_crypto_patterns = [
-            r'^([a-z]{2,5})$',  # Just the crypto symbol
-            r'price\s+([a-z]{2,5})$',  # price btc
-            r'^([a-z]{2,5})\s+price$',  # btc price
-        ]
+        message_stripped = message_lower.strip()
         
         # Check for simple crypto requests (default to USD)
-        for pattern in simple_crypto_patterns:
-            match = re.search(pattern, message_lower.strip())
+        for pattern in cls.SIMPLE_CRYPTO_PATTERNS:
+            match = pattern.search(message_stripped)
             if match:
                 potential_crypto = match.group(1).upper()
                 # Check if it's an excluded word (common greeting/conversation word)
@@ -256,16 +307,9 @@ class PriceTracker:
                         'to': 'USD'  # Default to USD
                     }
         
-        # Patterns for crypto prices with specified fiat
-        crypto_patterns = [
-            r'\b([a-z]{2,5})\s+(?:to\s+|in\s+)?([a-z]{3,4})\b',  # btc usd, xmr to eur
-            r'\b([a-z]{2,5})\s+price\s+(?:in\s+)?([a-z]{3,4})\b',  # btc price in usd
-            r'price\s+(?:of\s+)?([a-z]{2,5})\s+(?:in\s+)?([a-z]{3,4})\b',  # price of eth in eur
-        ]
-        
         # Check for crypto price requests with fiat
-        for pattern in crypto_patterns:
-            match = re.search(pattern, message_lower)
+        for pattern in cls.CRYPTO_PATTERNS:
+            match = pattern.search(message_lower)
             if match:
                 potential_crypto = match.group(1).upper()
                 potential_fiat = match.group(2).upper() if match.group(2) else 'USD'
@@ -284,14 +328,8 @@ class PriceTracker:
                             'to': potential_fiat
                         }
         
-        # Patterns for fiat exchange rates with amounts
-        fiat_amount_patterns = [
-            r'(\d+(?:\.\d+)?)\s+([a-z]{3})\s+(?:to\s+|in\s+)?([a-z]{3})\b',  # 100 usd to eur
-            r'convert\s+(\d+(?:\.\d+)?)\s+([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b',  # convert 50 cad to aud
-        ]
-        
-        for pattern in fiat_amount_patterns:
-            match = re.search(pattern, message_lower)
+        for pattern in cls.FIAT_AMOUNT_PATTERNS:
+            match = pattern.search(message_lower)
             if match:
                 amount = float(match.group(1))
                 from_currency = match.group(2).upper()
@@ -306,14 +344,8 @@ class PriceTracker:
                         'amount': amount
                     }
         
-        # Patterns for fiat exchange rates without amounts
-        fiat_patterns = [
-            r'\b([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b',  # usd to eur
-            r'exchange\s+rate\s+([a-z]{3})\s+(?:to\s+)?([a-z]{3})\b',  # exchange rate usd to nzd
-        ]
-        
-        for pattern in fiat_patterns:
-            match = re.search(pattern, message_lower)
+        for pattern in cls.FIAT_PATTERNS:
+            match = pattern.search(message_lower)
             if match:
                 from_currency = match.group(1).upper()
                 to_currency = match.group(2).upper() if len(match.groups()) > 1 else match.group(1).upper()
@@ -340,17 +372,19 @@ class PriceTracker:
             # Get crypto price
             price_data = await cls.get_crypto_price(request['from'], request['to'])
             if price_data and price_data['price']:
-                response = f"💰 **{request['from']} Price**\n"
-                response += f"Price: {cls.format_price(price_data['price'], request['to'])}\n"
+                lines = [
+                    f"💰 **{request['from']} Price**",
+                    f"Price: {cls.format_price(price_data['price'], request['to'])}"
+                ]
                 
                 if price_data.get('change_24h') is not None:
-                    response += f"24h Change: {cls.format_percentage(price_data['change_24h'])}\n"
+                    lines.append(f"24h Change: {cls.format_percentage(price_data['change_24h'])}")
                 
                 if price_data.get('volume_24h'):
                     volume_formatted = cls.format_price(price_data['volume_24h'], request['to'])
-                    response += f"24h Volume: {volume_formatted}"
+                    lines.append(f"24h Volume: {volume_formatted}")
                 
-                return response
+                return "\n".join(lines)
             else:
                 return f"❌ Couldn't fetch price for {request['from']} in {request['to']}"
         
@@ -361,13 +395,15 @@ class PriceTracker:
                 amount = request.get('amount', 1)
                 converted = amount * rate
                 
-                response = f"💱 **Exchange Rate**\n"
-                response += f"{cls.format_price(amount, request['from'])} = {cls.format_price(converted, request['to'])}\n"
+                lines = [
+                    "💱 **Exchange Rate**",
+                    f"{cls.format_price(amount, request['from'])} = {cls.format_price(converted, request['to'])}"
+                ]
                 
                 if amount != 1:
-                    response += f"Rate: 1 {request['from']} = {cls.format_price(rate, request['to'])}"
+                    lines.append(f"Rate: 1 {request['from']} = {cls.format_price(rate, request['to'])}")
                 
-                return response
+                return "\n".join(lines)
             else:
                 return f"❌ Couldn't fetch exchange rate for {request['from']} to {request['to']}"
         
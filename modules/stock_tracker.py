@@ -1,16 +1,46 @@
 """
 Stock market data tracker using yfinance
 """
+import asyncio
 import logging
+import time
 import yfinance as yf
+from collections import OrderedDict
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Cache for rendered stock responses (1 minute TTL), least recently used
+# tickers evicted first once full
+STOCK_CACHE = OrderedDict()
+STOCK_CACHE_TTL = 60  # 1 minute
+MAX_STOCK_CACHE_ENTRIES = 500
+
 class StockTracker:
     """Handles fetching and formatting stock market data"""
     
+    @staticmethod
+    def get_cached_response(cache_key: str) -> Optional[str]:
+        """Return a cached response if it is still fresh"""
+        cache_entry = STOCK_CACHE.get(cache_key)
+        if cache_entry and time.time() - cache_entry['timestamp'] < STOCK_CACHE_TTL:
+            STOCK_CACHE.move_to_end(cache_key)
+            return cache_entry['response']
+        return None
+    
+    @staticmethod
+    def cache_response(cache_key: str, response: str) -> str:
+        """Store a response in the cache, evicting the least recently used, and return it"""
+        STOCK_CACHE[cache_key] = {
+            'response': response,
+            'timestamp': time.time()
+        }
+        STOCK_CACHE.move_to_end(cache_key)
+        while len(STOCK_CACHE) > MAX_STOCK_CACHE_ENTRIES:
+            STOCK_CACHE.popitem(last=False)
+        return response
+    
     @classmethod
     def format_currency(cls, value: float) -> str:
         """Format currency values"""
@@ -46,10 +76,27 @@ class StockTracker:
     @classmethod
     async def get_stock_info(cls, ticker: str) -> Optional[str]:
         """Get comprehensive stock information"""
+        # Clean the ticker symbol
+        ticker = ticker.upper().strip()
+        
+        # Check cache
+        cached = cls.get_cached_response(ticker)
+        if cached:
+            return cached
+        
+        # yfinance is blocking, so fetch in a worker thread to keep the event loop responsive
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(None, cls.build_stock_info, ticker)
+        
+        # Cache on the event loop thread, and only successful lookups
+        if response.startswith("❌"):
+            return response
+        return cls.cache_response(ticker, response)
+    
+    @classmethod
+    def build_stock_info(cls, ticker: str) -> str:
+        """Fetch and format stock information for a cleaned ticker (blocking)"""
         try:
-            # Clean the ticker symbol
-            ticker = ticker.upper().strip()
-            
             # Create ticker object
             stock = yf.Ticker(ticker)
             
@@ -120,7 +167,7 @@ class StockTracker:
             beta = info.get('beta', 0)
             
             # Build response
-            response = f"""📊 **Stock Info: {company_name} ({ticker})**
+            parts = [f"""📊 **Stock Info: {company_name} ({ticker})**
 🏢 Exchange: {exchange} | Currency: {currency}
 
 💵 **Current Price:** {cls.format_currency(current_price)}
@@ -134,54 +181,78 @@ class StockTracker:
 
 📊 **Volume:**
 • Current: {cls.format_volume(volume)}
-• Average: {cls.format_volume(avg_volume)}"""
+• Average: {cls.format_volume(avg_volume)}"""]
 
             if volume and avg_volume:
                 volume_ratio = (volume / avg_volume) * 100
-                response += f"\n• Volume vs Avg: {volume_ratio:.0f}%"
+                parts.append(f"• Volume vs Avg: {volume_ratio:.0f}%")
 
-            response += f"\n\n💰 **Market Cap:** {cls.format_currency(market_cap)}"
+            parts.append(f"\n💰 **Market Cap:** {cls.format_currency(market_cap)}")
 
-            response += f"\n\n📉 **52 Week Range:**"
-            response += f"\n• Low: {cls.format_currency(week_52_low)}"
-            response += f"\n• High: {cls.format_currency(week_52_high)}"
+            parts.append("\n📉 **52 Week Range:**")
+            parts.append(f"• Low: {cls.format_currency(week_52_low)}")
+            parts.append(f"• High: {cls.format_currency(week_52_high)}")
             
             if week_52_high and week_52_low:
                 range_position = ((current_price - week_52_low) / (week_52_high - week_52_low)) * 100
-                response += f"\n• Position: {range_position:.0f}% of range"
+                parts.append(f"• Position: {range_position:.0f}% of range")
 
             if ma_50 or ma_200:
-                response += f"\n\n📊 **Moving Averages:**"
+                parts.append("\n📊 **Moving Averages:**")
                 if ma_50:
                     ma_50_diff = ((current_price - ma_50) / ma_50) * 100
-                    response += f"\n• 50-Day MA: {cls.format_currency(ma_50)} ({ma_50_diff:+.1f}%)"
+                    parts.append(f"• 50-Day MA: {cls.format_currency(ma_50)} ({ma_50_diff:+.1f}%)")
                 if ma_200:
                     ma_200_diff = ((current_price - ma_200) / ma_200) * 100
-                    response += f"\n• 200-Day MA: {cls.format_currency(ma_200)} ({ma_200_diff:+.1f}%)"
+                    parts.append(f"• 200-Day MA: {cls.format_currency(ma_200)} ({ma_200_diff:+.1f}%)")
 
             if pe_ratio or forward_pe or dividend_yield or beta:
-                response += f"\n\n📈 **Fundamentals:**"
+                parts.append("\n📈 **Fundamentals:**")
                 if pe_ratio:
-                    response += f"\n• P/E Ratio: {pe_ratio:.2f}"
+                    parts.append(f"• P/E Ratio: {pe_ratio:.2f}")
                 if forward_pe:
-                    response += f"\n• Forward P/E: {forward_pe:.2f}"
+                    parts.append(f"• Forward P/E: {forward_pe:.2f}")
                 if dividend_yield:
-                    response += f"\n• Dividend Yield: {dividend_yield*100:.2f}%"
+                    parts.append(f"• Dividend Yield: {dividend_yield*100:.2f}%")
                 if beta:
-                    response += f"\n• Beta: {beta:.2f}"
+                    parts.append(f"• Beta: {beta:.2f}")
 
             # Add timestamp
-            response += f"\n\n⏰ _Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}_"
+            parts.append(f"\n⏰ _Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}_")
             
+            response = "\n".join(parts)
             return response
             
         except Exception as e:
-            logger.error(f"Error fetching stock data for {ticker}: {e}")
+            logger.error("Error fetching stock data for %s: %s", ticker, e)
             return f"❌ Error fetching stock data for '{ticker}'. Please check the ticker symbol and try again."
     
+    @classmethod
+    def get_index_line(cls, symbol: str, name: str) -> Optional[str]:
+        """Fetch a market index and format its summary line (blocking)"""
+        try:
+            ticker = yf.Ticker(symbol)
+            hist = ticker.history(period="2d")
+            
+            if not hist.empty and len(hist) >= 2:
+                current = hist['Close'].iloc[-1]
+                previous = hist['Close'].iloc[-2]
+                change_pct = ((current - previous) / previous) * 100
+                
+                return f"**{name}:** {current:.2f} {cls.format_percentage(change_pct)}"
+        except Exception as e:
+            logger.debug("Error fetching index %s: %s", symbol, e)
+        
+        return None
+    
     @classmethod
     async def get_market_summary(cls) -> str:
         """Get a summary of major market indices"""
+        # Check cache
+        cached = cls.get_cached_response('^SUMMARY')
+        if cached:
+            return cached
+        
         try:
             indices = {
                 '^GSPC': 'S&P 500',
@@ -192,27 +263,26 @@ class StockTracker:
                 '^N225': 'Nikkei 225'
             }
             
-            response = "🌍 **Global Market Summary**\n\n"
-            
-            for symbol, name in indices.items():
-                try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period="2d")
-                    
-                    if not hist.empty and len(hist) >= 2:
-                        current = hist['Close'].iloc[-1]
-                        previous = hist['Close'].iloc[-2]
-                        change_pct = ((current - previous) / previous) * 100
-                        
-                        response += f"**{name}:** {current:.2f} {cls.format_percentage(change_pct)}\n"
-                except:
-                    continue
-            
-            response += f"\n⏰ _Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}_"
-            return response
+            # yfinance is blocking, so fetch all indices concurrently in worker threads
+            loop = asyncio.get_running_loop()
+            lines = await asyncio.gather(*(
+                loop.run_in_executor(None, cls.get_index_line, symbol, name)
+                for symbol, name in indices.items()
+            ))
+            
+            index_lines = [line for line in lines if line]
+            if not index_lines:
+                # Every index failed (outage or rate limit), so don't cache an empty summary
+                return "❌ Error fetching market summary. Please try again later."
+            
+            parts = ["🌍 **Global Market Summary**\n"]
+            parts.extend(index_lines)
+            
+            parts.append(f"\n⏰ _Updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}_")
+            return cls.cache_response('^SUMMARY', "\n".join(parts))
             
         except Exception as e:
-            logger.error(f"Error fetching market summary: {e}")
+            logger.error("Error fetching market summary: %s", e)
             return "❌ Error fetching market summary. Please try again later."
 
 # Create singleton instance
@@ -3,6 +3,7 @@ World Clock module for displaying time in different cities/countries
 """
 import logging
 from datetime import datetime
+from itertools import chain, islice
 from typing import Optional, List, Tuple
 import pytz
 from pytz import timezone, all_timezones, country_timezones
@@ -10,6 +11,19 @@ from pytz.exceptions import UnknownTimeZoneError
 
 logger = logging.getLogger(__name__)
 
+def build_timezone_index() -> dict:
+    """
+    Map lowercase timezone names, and the last part of each name
+    (e.g., "paris" for "Europe/Paris"), to the timezone. Built once so
+    lookups don't scan every timezone; the first match in pytz order wins.
+    """
+    index = {}
+    for tz in all_timezones:
+        index.setdefault(tz.lower(), tz)
+        if '/' in tz:
+            index.setdefault(tz.split('/')[-1].lower(), tz)
+    return index
+
 class WorldClock:
     """Handles world clock functionality for different cities and countries"""
     
@@ -215,6 +229,30 @@ class WorldClock:
         'nz': 'Pacific/Auckland',
     }
     
+    # Common timezone abbreviations
+    TZ_ABBREVIATIONS = {
+        'utc': 'UTC',
+        'gmt': 'GMT',
+        'est': 'US/Eastern',
+        'edt': 'US/Eastern',
+        'cst': 'US/Central',
+        'cdt': 'US/Central',
+        'mst': 'US/Mountain',
+        'mdt': 'US/Mountain',
+        'pst': 'US/Pacific',
+        'pdt': 'US/Pacific',
+        'bst': 'Europe/London',
+        'cet': 'Europe/Paris',
+        'cest': 'Europe/Paris',
+        'jst': 'Asia/Tokyo',
+        'ist': 'Asia/Kolkata',
+        'aest': 'Australia/Sydney',
+        'aedt': 'Australia/Sydney',
+    }
+    
+    # Case-insensitive lookup of every pytz timezone name
+    TIMEZONE_INDEX = build_timezone_index()
+    
     @classmethod
     def get_timezone_for_location(cls, location: str) -> Optional[str]:
         """Get timezone for a given location (city or country)"""
@@ -228,42 +266,13 @@ class WorldClock:
         if location_lower in cls.COUNTRY_TIMEZONES:
             return cls.COUNTRY_TIMEZONES[location_lower]
         
-        # Try to find it as a timezone directly (e.g., "UTC", "EST", "PST")
-        try:
-            # Check common abbreviations
-            tz_abbreviations = {
-                'utc': 'UTC',
-                'gmt': 'GMT',
-                'est': 'US/Eastern',
-                'edt': 'US/Eastern',
-                'cst': 'US/Central',
-                'cdt': 'US/Central',
-                'mst': 'US/Mountain',
-                'mdt': 'US/Mountain',
-                'pst': 'US/Pacific',
-                'pdt': 'US/Pacific',
-                'bst': 'Europe/London',
-                'cet': 'Europe/Paris',
-                'cest': 'Europe/Paris',
-                'jst': 'Asia/Tokyo',
-                'ist': 'Asia/Kolkata',
-                'aest': 'Australia/Sydney',
-                'aedt': 'Australia/Sydney',
-            }
-            
-            if location_lower in tz_abbreviations:
-                return tz_abbreviations[location_lower]
-            
-            # Try to find it in all timezones (case-insensitive)
-            for tz in all_timezones:
-                if location_lower == tz.lower():
-                    return tz
-                # Also check the last part of the timezone (e.g., "paris" for "Europe/Paris")
-                if '/' in tz and location_lower == tz.split('/')[-1].lower():
-                    return tz
-            
-        except Exception as e:
-            logger.error(f"Error checking timezone: {e}")
+        # Try to find it as a timezone abbreviation (e.g., "UTC", "EST", "PST")
+        if location_lower in cls.TZ_ABBREVIATIONS:
+            return cls.TZ_ABBREVIATIONS[location_lower]
+        
+        # Try to find it in all timezones (case-insensitive)
+        if location_lower in cls.TIMEZONE_INDEX:
+            return cls.TIMEZONE_INDEX[location_lower]
         
         return None
     
@@ -308,26 +317,23 @@ class WorldClock:
             return response, None
             
         except Exception as e:
-            logger.error(f"Error getting time for {location}: {e}")
+            logger.error("Error getting time for %s: %s", location, e)
             return None, f"Error getting time for '{location}': {str(e)}"
     
     @classmethod
     def get_location_suggestions(cls, query: str) -> List[str]:
         """Get suggestions for similar location names"""
         query_lower = query.lower()
-        suggestions = []
-        
-        # Check cities
-        for city in cls.CITY_TIMEZONES.keys():
-            if query_lower in city or city.startswith(query_lower):
-                suggestions.append(city.title())
         
-        # Check countries
-        for country in cls.COUNTRY_TIMEZONES.keys():
-            if query_lower in country or country.startswith(query_lower):
-                suggestions.append(country.title())
+        # Check cities, then countries
+        matches = (
+            name.title()
+            for name in chain(cls.CITY_TIMEZONES, cls.COUNTRY_TIMEZONES)
+            if query_lower in name
+        )
         
-        return suggestions[:5]  # Return top 5 suggestions
+        # Stop scanning as soon as we have the top 5 suggestions
+        return list(islice(matches, 5))
     
     @classmethod
     def get_multiple_times(cls, locations: List[str]) -> str:
@@ -342,15 +348,13 @@ class WorldClock:
             elif error:
                 errors.append(error)
         
-        response = ""
+        sections = []
         if results:
-            response = "\n\n".join(results)
+            sections.append("\n\n".join(results))
         if errors:
-            if response:
-                response += "\n\n"
-            response += "⚠️ " + "\n".join(errors)
+            sections.append("⚠️ " + "\n".join(errors))
         
-        return response if response else "No valid locations found."
+        return "\n\n".join(sections) if sections else "No valid locations found."
     
     @classmethod
     async def handle_clock_command(cls, query: str) -> str: